@@ -1,7 +1,13 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import List
-import uuid
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.routing import APIRoute
+from functools import lru_cache
+from hashlib import blake2b
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
+from pydantic.dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+import orjson
+import secrets
 
 app = FastAPI(
     title="API управління кошиком та доставкою",
@@ -9,23 +15,82 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Стискання великих відповідей (списки товарів та адрес); дрібні відповіді передаються як є
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+# ==========================================
+# Розбір тіла запитів через orjson
+# ==========================================
+
+class ORJSONRequest(Request):
+    """Запит, тіло якого декодується orjson замість стандартного json.loads."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """
+    Маршрут, що передає обробнику ORJSONRequest.
+    Валідація Pydantic та схема OpenAPI залишаються без змін; помилки orjson
+    успадковані від json.JSONDecodeError, тому некоректний JSON так само дає 422.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request) -> Response:
+            return await route_handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
+
+app.router.route_class = ORJSONRoute
+
 # ================================
 # Моделі даних (Pydantic Models)
 # ================================
 
-class Product(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Унікальний ідентифікатор товару")
+def new_id() -> str:
+    """Новий випадковий ідентифікатор (128 біт у hex) без побудови об'єкта UUID."""
+    return secrets.token_hex(16)
+
+# Товари та адреси зберігаються у великій кількості й після створення не змінюються,
+# тому це dataclass зі __slots__: без __dict__ на кожен екземпляр вони займають у кілька разів менше пам'яті
+
+@dataclass(slots=True)
+class Product:
+    id: str = Field(default_factory=new_id, description="Унікальний ідентифікатор товару")
     name: str = Field(..., description="Назва товару")
     price: float = Field(..., description="Ціна одиниці товару")
     quantity: int = Field(..., description="Кількість одиниць товару")
 
 class Cart(BaseModel):
     user_id: str = Field(..., description="Ідентифікатор користувача")
-    items: List[Product] = Field(default_factory=list, description="Список товарів в кошику")
     total: float = Field(0.0, description="Загальна вартість кошика")
 
-class DeliveryAddress(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Унікальний ідентифікатор адреси")
+    # Товари зберігаються за їх ідентифікатором (у порядку додавання),
+    # щоб видалення виконувалось одним пошуком у словнику замість перебору списку
+    _index: Dict[str, Product] = PrivateAttr(default_factory=dict)
+    # ETag останньої відданої версії кошика; None, доки кошик не серіалізовано
+    _etag: Optional[str] = PrivateAttr(None)
+
+    @computed_field(description="Список товарів в кошику")
+    @property
+    def items(self) -> List[Product]:
+        return list(self._index.values())
+
+    def add_product(self, product: Product) -> None:
+        """Додати товар; товар з тим самим ідентифікатором замінюється, загальна вартість перераховується."""
+        replaced = self._index.get(product.id)
+        if replaced:
+            self.total -= replaced.price * replaced.quantity
+        self._index[product.id] = product
+        self.total += product.price * product.quantity
+
+@dataclass(slots=True)
+class DeliveryAddress:
+    id: str = Field(default_factory=new_id, description="Унікальний ідентифікатор адреси")
     street: str = Field(..., description="Вулиця")
     city: str = Field(..., description="Місто")
     postal_code: str = Field(..., description="Поштовий індекс")
@@ -44,6 +109,8 @@ class DeliveryInfo(BaseModel):
     delivery_cost: float = Field(..., description="Вартість доставки")
     status: str = Field(..., description="Статус доставки (наприклад, Processing, Shipped, Delivered)")
 
+    _etag: Optional[str] = PrivateAttr(None)
+
 class AvailabilityCheckRequest(BaseModel):
     region: str = Field(..., description="Регіон доставки")
     product_id: str = Field(..., description="Ідентифікатор товару")
@@ -59,26 +126,67 @@ class AvailabilityCheckResponse(BaseModel):
 carts = {}           # Ключ: user_id, значення: об'єкт Cart
 user_addresses = {}  # Ключ: user_id, значення: список DeliveryAddress
 deliveries = {}      # Ключ: order_id, значення: об'єкт DeliveryInfo
+delivery_payloads = {}  # Ключ: order_id, значення: серіалізований DeliveryInfo (bytes); при зміні доставки запис треба видаляти
+
+# Спільне незмінне значення для користувачів без адрес, щоб не створювати новий список
+NO_ADDRESSES: tuple = ()
+
+def new_cart(user_id: str) -> Cart:
+    """
+    Створити порожній кошик для сховища.
+    user_id уже перевірений FastAPI як параметр шляху, тому модель будується без валідації.
+    """
+    return Cart.model_construct(user_id=user_id)
+
+def json_response(data) -> Response:
+    """
+    Серіалізувати вже сформовані дані через orjson без повторної валідації.
+    FastAPI не перевіряє response_model, якщо ендпоінт повертає готовий Response,
+    тому response_model у декораторах лишається лише для документації OpenAPI.
+    """
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
+def model_json_response(model) -> Response:
+    """
+    Серіалізувати модель одразу в JSON-байти нативним серіалізатором pydantic-core,
+    без проміжного словника model_dump().
+    """
+    return Response(content=model.__pydantic_serializer__.to_json(model), media_type="application/json")
+
+def tagged_json_response(model) -> Response:
+    """
+    Серіалізувати модель сховища та запам'ятати ETag отриманого тіла в model._etag,
+    щоб наступні GET-запити з If-None-Match отримували 304 без повторної серіалізації.
+    """
+    body = model.__pydantic_serializer__.to_json(model)
+    model._etag = '"%s"' % blake2b(body, digest_size=8).hexdigest()
+    return Response(content=body, media_type="application/json", headers={"ETag": model._etag})
+
+def not_modified(model, if_none_match: Optional[str]) -> bool:
+    """Чи збігається ETag з заголовка If-None-Match з останньою відданою версією моделі."""
+    return if_none_match is not None and if_none_match == model._etag
 
 # ==========================================
 # Ендпоінти для управління кошиком (Cart API)
 # ==========================================
 
 @app.get("/cart/{user_id}", response_model=Cart, tags=["Кошик"])
-def get_cart(user_id: str):
+async def get_cart(user_id: str, if_none_match: Optional[str] = Header(None)):
     """
     Отримати інформацію про кошик користувача.
     Якщо кошик не існує, створюється новий порожній кошик.
+    Якщо заголовок If-None-Match збігається з поточним ETag кошика, повертається 304.
     """
-    if user_id in carts:
-        return carts[user_id]
-    else:
-        cart = Cart(user_id=user_id)
+    cart = carts.get(user_id)
+    if not cart:
+        cart = new_cart(user_id)
         carts[user_id] = cart
-        return cart
+    elif not_modified(cart, if_none_match):
+        return Response(status_code=304, headers={"ETag": cart._etag})
+    return tagged_json_response(cart)
 
 @app.post("/cart/{user_id}/items", response_model=Cart, tags=["Кошик"])
-def add_product_to_cart(user_id: str, product: Product):
+async def add_product_to_cart(user_id: str, product: Product):
     """
     Додати товар до кошика.
     
@@ -93,33 +201,56 @@ def add_product_to_cart(user_id: str, product: Product):
     """
     cart = carts.get(user_id)
     if not cart:
-        cart = Cart(user_id=user_id)
+        cart = new_cart(user_id)
+        carts[user_id] = cart
+    cart.add_product(product)
+    return tagged_json_response(cart)
+
+@app.post("/cart/{user_id}/items/bulk", response_model=Cart, tags=["Кошик"])
+async def add_products_to_cart(user_id: str, products: List[Product]):
+    """
+    Додати кілька товарів до кошика одним запитом.
+    
+    **Приклад запиту (JSON):**
+    ```json
+    [
+      {
+        "name": "Ноутбук",
+        "price": 1200.99,
+        "quantity": 1
+      },
+      {
+        "name": "Миша",
+        "price": 25.5,
+        "quantity": 2
+      }
+    ]
+    ```
+    """
+    cart = carts.get(user_id)
+    if not cart:
+        cart = new_cart(user_id)
         carts[user_id] = cart
-    cart.items.append(product)
-    cart.total += product.price * product.quantity
-    return cart
+    for product in products:
+        cart.add_product(product)
+    return tagged_json_response(cart)
 
 @app.delete("/cart/{user_id}/items/{product_id}", response_model=Cart, tags=["Кошик"])
-def remove_product_from_cart(user_id: str, product_id: str):
+async def remove_product_from_cart(user_id: str, product_id: str):
     """
     Видалити товар з кошика за ідентифікатором товару.
     """
     cart = carts.get(user_id)
     if not cart:
         raise HTTPException(status_code=404, detail="Кошик не знайдено")
-    product_to_remove = None
-    for item in cart.items:
-        if item.id == product_id:
-            product_to_remove = item
-            break
+    product_to_remove = cart._index.pop(product_id, None)
     if not product_to_remove:
         raise HTTPException(status_code=404, detail="Товар не знайдено в кошику")
-    cart.items.remove(product_to_remove)
     cart.total -= product_to_remove.price * product_to_remove.quantity
-    return cart
+    return tagged_json_response(cart)
 
 @app.post("/cart/{user_id}/checkout", response_model=DeliveryInfo, tags=["Кошик", "Доставка"])
-def checkout(user_id: str, address: DeliveryAddress):
+async def checkout(user_id: str, address: DeliveryAddress):
     """
     Оформлення замовлення:
     
@@ -138,15 +269,16 @@ def checkout(user_id: str, address: DeliveryAddress):
     ```
     """
     cart = carts.get(user_id)
-    if not cart or len(cart.items) == 0:
+    if not cart or len(cart._index) == 0:
         raise HTTPException(status_code=400, detail="Кошик порожній")
     
     # Обчислення вартості доставки:
     base_cost = 5.0
-    delivery_cost = base_cost + sum(item.quantity * item.price for item in cart.items)
+    delivery_cost = base_cost + cart.total
     
-    order_id = str(uuid.uuid4())
-    delivery_info = DeliveryInfo(
+    order_id = new_id()
+    # Адреса вже провалідована FastAPI як тіло запиту, тож повторна валідація не потрібна
+    delivery_info = DeliveryInfo.model_construct(
         order_id=order_id,
         user_id=user_id,
         delivery_address=address,
@@ -156,16 +288,34 @@ def checkout(user_id: str, address: DeliveryAddress):
     deliveries[order_id] = delivery_info
 
     # Очищення кошика після оформлення замовлення
-    carts[user_id] = Cart(user_id=user_id)
+    carts[user_id] = new_cart(user_id)
     
-    return delivery_info
+    response = tagged_json_response(delivery_info)
+    delivery_payloads[order_id] = response.body
+    return response
 
 # ======================================
 # Ендпоінти для управління доставкою
 # ======================================
 
+# Значення в нижньому регістрі, з якими порівнюються дані запитів
+UKRAINE = "україна"
+UNAVAILABLE_REGION = "схід"
+
+# Проста логіка: для України вартість 5.0, для інших країн – 15.0
+DELIVERY_COSTS = {UKRAINE: 5.0}
+DEFAULT_DELIVERY_COST = 15.0
+
+@lru_cache(maxsize=256)
+def delivery_cost_for_country(country: str) -> float:
+    """
+    Вартість доставки для країни. Результат кешується за назвою країни
+    в тому вигляді, як її передав клієнт, щоб не приводити рядок до нижнього регістру щоразу.
+    """
+    return DELIVERY_COSTS.get(country.lower(), DEFAULT_DELIVERY_COST)
+
 @app.post("/delivery/calculate", response_model=DeliveryCostResponse, tags=["Доставка"])
-def calculate_delivery_cost(request: DeliveryCostRequest):
+async def calculate_delivery_cost(request: DeliveryCostRequest):
     """
     Обчислення вартості доставки на основі адреси користувача.
     
@@ -181,25 +331,36 @@ def calculate_delivery_cost(request: DeliveryCostRequest):
     }
     ```
     """
-    # Проста логіка: для України вартість 5.0, для інших країн – 15.0
-    if request.address.country.lower() == "україна":
-        cost = 5.0
-    else:
-        cost = 15.0
-    return DeliveryCostResponse(cost=cost)
+    return model_json_response(DeliveryCostResponse(cost=delivery_cost_for_country(request.address.country)))
 
 @app.get("/delivery/info/{order_id}", response_model=DeliveryInfo, tags=["Доставка"])
-def get_delivery_info(order_id: str):
+async def get_delivery_info(order_id: str, if_none_match: Optional[str] = Header(None)):
     """
     Отримання інформації про доставку за номером замовлення.
+    Якщо заголовок If-None-Match збігається з поточним ETag доставки, повертається 304.
     """
     delivery = deliveries.get(order_id)
     if not delivery:
         raise HTTPException(status_code=404, detail="Інформацію про доставку не знайдено")
-    return delivery
+    if not_modified(delivery, if_none_match):
+        return Response(status_code=304, headers={"ETag": delivery._etag})
+    body = delivery_payloads.get(order_id)
+    if body is None:
+        response = tagged_json_response(delivery)
+        delivery_payloads[order_id] = response.body
+        return response
+    return Response(content=body, media_type="application/json", headers={"ETag": delivery._etag})
+
+# Відповідь перевірки доступності має лише два варіанти, тож вони серіалізуються один раз
+AVAILABLE_RESPONSE_BODY = orjson.dumps(
+    AvailabilityCheckResponse(available=True, message="Товар доступний для доставки").model_dump()
+)
+UNAVAILABLE_RESPONSE_BODY = orjson.dumps(
+    AvailabilityCheckResponse(available=False, message="Товар недоступний для доставки в даний регіон").model_dump()
+)
 
 @app.post("/delivery/availability", response_model=AvailabilityCheckResponse, tags=["Доставка"])
-def check_delivery_availability(request: AvailabilityCheckRequest):
+async def check_delivery_availability(request: AvailabilityCheckRequest):
     """
     Перевірка доступності товарів для доставки в певний регіон.
     
@@ -213,24 +374,31 @@ def check_delivery_availability(request: AvailabilityCheckRequest):
     
     Логіка: для прикладу, якщо регіон "Схід" і ідентифікатор товару закінчується на "1", товар недоступний.
     """
-    if request.region.lower() == "схід" and request.product_id.endswith("1"):
-        return AvailabilityCheckResponse(available=False, message="Товар недоступний для доставки в даний регіон")
+    region = request.region
+    # Перевірка довжини відсікає більшість регіонів без створення нового рядка через lower()
+    if (
+        len(region) == len(UNAVAILABLE_REGION)
+        and request.product_id.endswith("1")
+        and region.lower() == UNAVAILABLE_REGION
+    ):
+        body = UNAVAILABLE_RESPONSE_BODY
     else:
-        return AvailabilityCheckResponse(available=True, message="Товар доступний для доставки")
+        body = AVAILABLE_RESPONSE_BODY
+    return Response(content=body, media_type="application/json")
 
 # =============================================
 # Ендпоінти для управління адресами доставки
 # =============================================
 
 @app.get("/user/{user_id}/addresses", response_model=List[DeliveryAddress], tags=["Адреса доставки"])
-def get_user_addresses(user_id: str):
+async def get_user_addresses(user_id: str):
     """
     Отримання списку адрес доставки користувача.
     """
-    return user_addresses.get(user_id, [])
+    return json_response(user_addresses.get(user_id, NO_ADDRESSES))
 
 @app.post("/user/{user_id}/addresses", response_model=List[DeliveryAddress], tags=["Адреса доставки"])
-def add_delivery_address(user_id: str, address: DeliveryAddress):
+async def add_delivery_address(user_id: str, address: DeliveryAddress):
     """
     Додавання нової адреси доставки до профілю користувача.
     
@@ -244,14 +412,15 @@ def add_delivery_address(user_id: str, address: DeliveryAddress):
     }
     ```
     """
-    addresses = user_addresses.get(user_id, [])
+    addresses = user_addresses.setdefault(user_id, [])
     addresses.append(address)
-    user_addresses[user_id] = addresses
-    return addresses
+    return json_response(addresses)
 
 # ============================
 # Запуск додатку (як standalone)
 # ============================
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop та httptools замінюють стандартний цикл подій і HTTP-парсер на C-реалізації.
+    # Дані зберігаються в пам'яті процесу, тому запускається лише один воркер.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")